@@ -1,7 +1,7 @@
 import streamlit as st
-import random
+import numpy as np
 import time
-import matplotlib.pyplot as plt
+import plotly.graph_objects as go
 import pandas as pd
 from io import StringIO
 import datetime
@@ -20,27 +20,42 @@ for i in range(number_of_cells):
     cell_types.append(cell_type)
 
 # ------------------ Generate Cells Data ------------------
-cells_data = {}
-
-for idx, cell_type in enumerate(cell_types, start=1):
-    cell_key = f"Cell {idx} ({cell_type})"
-
-    voltage = 3.2 if cell_type == "lfp" else 3.6
-    min_voltage = 2.8 if cell_type == "lfp" else 3.2
-    max_voltage = 3.6 if cell_type == "lfp" else 4.0
-    current = round(random.uniform(0.5, 2.0), 2)
-    temp = round(random.uniform(25, 40), 1)
-    capacity = round(voltage * current, 2)
-
-    cells_data[cell_key] = {
-        "voltage": voltage,
-        "current": current,
-        "temp": temp,
-        "capacity": capacity,
-        "min_voltage": min_voltage,
-        "max_voltage": max_voltage
+# Vectorized: one RNG call per metric instead of a Python loop per cell.
+# Cached so widget interactions with an unchanged cell configuration reuse
+# the same data instead of re-drawing random values on every rerun.
+@st.cache_data
+def build_cells(n, types, seed):
+    rng = np.random.default_rng(seed)
+    is_lfp = np.array(types) == "lfp"
+
+    voltage = np.where(is_lfp, 3.2, 3.6)
+    min_voltage = np.where(is_lfp, 2.8, 3.2)
+    max_voltage = np.where(is_lfp, 3.6, 4.0)
+    current = rng.uniform(0.5, 2.0, n).round(2)
+    temp = rng.uniform(25, 40, n).round(1)
+    capacity = (voltage * current).round(2)
+
+    return {
+        f"Cell {idx} ({cell_type})": {
+            "voltage": v,
+            "current": c,
+            "temp": t,
+            "capacity": cap,
+            "min_voltage": min_v,
+            "max_voltage": max_v
+        }
+        for idx, (cell_type, v, c, t, cap, min_v, max_v) in enumerate(
+            zip(types, voltage, current, temp, capacity, min_voltage, max_voltage),
+            start=1
+        )
     }
 
+if st.sidebar.button("🔁 Regenerate Cells"):
+    st.session_state["cells_seed"] = st.session_state.get("cells_seed", 0) + 1
+
+cells_data = build_cells(number_of_cells, tuple(cell_types),
+                         st.session_state.setdefault("cells_seed", 0))
+
 # ------------------ Dashboard Display ------------------
 st.subheader("🔋 Battery Dashboard")
 cols = st.columns(number_of_cells)
@@ -90,49 +105,58 @@ for i in range(num_tasks):
 
     task_list.append(task)
 
+# ------------------ Simulation Core ------------------
+@st.cache_data
+def encode_csv(df):
+    """Serialize a result frame once; reruns reuse the cached bytes."""
+    return df.to_csv(index=False).encode("utf-8")
+
+# One C-backed generator for the whole script; build_cells keeps its own
+# seed-keyed generator so its cache stays deterministic.
+_RNG = np.random.default_rng()
+
+def _simulate(n):
+    """Draw the full n-step voltage/current/temperature series in one shot."""
+    times = np.arange(n)
+    voltages = _RNG.uniform(3.0, 4.2, n).round(2)
+    currents = _RNG.uniform(0.5, 5.0, n).round(2)
+    temps = _RNG.uniform(25, 45, n).round(1)
+    return times, voltages, currents, temps
+
 # ------------------ Simulation Trigger ------------------
 if st.button("▶ Start Simulation"):
     st.success("Running simulation...")
 
-    voltages = []
-    currents = []
-    temps = []
-    times = []
+    num_steps = 100
+    times, voltages, currents, temps = _simulate(num_steps)
 
     progress_bar = st.progress(0)
     graph_placeholder = st.empty()
     start_time = datetime.datetime.now()
 
-    for t in range(100):
-        voltage = round(random.uniform(3.0, 4.2), 2)
-        current = round(random.uniform(0.5, 5.0), 2)
-        temp = round(random.uniform(25, 45), 1)
-
-        voltages.append(voltage)
-        currents.append(current)
-        temps.append(temp)
-        times.append(t)
-
-        progress_bar.progress((t + 1) / 100)
-        time.sleep(0.05)
-
-        with graph_placeholder.container():
-            fig, ax1 = plt.subplots()
-
-            ax2 = ax1.twinx()
-            ax1.plot(times, voltages, 'g-', label="Voltage (V)")
-            ax2.plot(times, currents, 'b--', label="Current (A)")
-
-            ax1.set_xlabel("Time (s)")
-            ax1.set_ylabel("Voltage (V)", color="green")
-            ax2.set_ylabel("Current (A)", color="blue")
-
-            fig.suptitle("🔌 Real-Time Voltage and Current vs Time")
-            ax1.tick_params(axis='y', labelcolor='green')
-            ax2.tick_params(axis='y', labelcolor='blue')
+    # Build the figure once; the loop only updates trace data and redraws
+    # every few steps instead of rebuilding and reserializing each frame.
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=[], y=[], mode="lines", name="Voltage (V)",
+                             line=dict(color="green")))
+    fig.add_trace(go.Scatter(x=[], y=[], mode="lines", name="Current (A)",
+                             line=dict(color="blue", dash="dash"), yaxis="y2"))
+    fig.update_layout(
+        title="🔌 Real-Time Voltage and Current vs Time",
+        xaxis_title="Time (s)",
+        yaxis=dict(title="Voltage (V)", color="green"),
+        yaxis2=dict(title="Current (A)", color="blue", overlaying="y", side="right")
+    )
 
-            fig.tight_layout()
-            st.pyplot(fig)
+    # Stream the precomputed series as ten batched frames: one sleep, one
+    # progress update and one chart push per batch instead of per step.
+    batch_size = 10
+    for batch_end in range(batch_size, num_steps + 1, batch_size):
+        time.sleep(0.5)
+        progress_bar.progress(batch_end / num_steps)
+        fig.data[0].x, fig.data[0].y = times[:batch_end], voltages[:batch_end]
+        fig.data[1].x, fig.data[1].y = times[:batch_end], currents[:batch_end]
+        graph_placeholder.plotly_chart(fig, use_container_width=True)
 
     st.success("✅ Simulation Complete!")
 
@@ -147,16 +171,15 @@ if st.button("▶ Start Simulation"):
     st.subheader("📄 Export Graph Data")
     st.dataframe(df.head())
 
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
     st.download_button(
         label="📥 Download Simple CSV",
-        data=csv_buffer.getvalue(),
+        data=encode_csv(df),
         file_name="battery_simulation_data.csv",
         mime="text/csv"
     )
 
     # ------------------ Detailed Report CSV Export ------------------
+    @st.cache_data
     def generate_simulation_csv(voltages, temps, currents, start_time, jump_events):
         test_data_rows = []
         for i, (v, t, c) in enumerate(zip(voltages, temps, currents)):
@@ -1,14 +1,21 @@
 import streamlit as st
-import pandas as pd
+import atexit
+import hashlib
+import os
+import tempfile
+import numpy as np
 from datetime import datetime
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from streamlit_autorefresh import st_autorefresh
 
 # Page config
 st.set_page_config(page_title=" Battery Dashboard", layout="wide", initial_sidebar_state="expanded")
 
-# CSS styling for visuals
-st.markdown("""
+# CSS styling for visuals — built once at import. It still has to be
+# emitted on every rerun (Streamlit drops elements that are not re-sent),
+# but the string itself is a module constant rather than a per-run literal.
+_CSS = """
     <style>
     /* Header Banner */
     .header-container {
@@ -69,16 +76,101 @@ st.markdown("""
         box-shadow: 0 4px 8px rgba(0,0,0,0.1);
     }
     </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(_CSS, unsafe_allow_html=True)
 
 # ---------- State ----------
+# History is a struct-of-arrays ring buffer: one preallocated ndarray per
+# metric of shape (max_history, MAX_CELLS) plus a timestamp array and a
+# monotonically increasing head counter. Appends are a row write at
+# head % max_history and trimming is implicit, so per-refresh cost stays
+# flat and Tab 2 reads contiguous column slices instead of walking a
+# list of dicts.
+MAX_CELLS = 20
+HISTORY_METRICS = ('voltages', 'currents', 'temperatures', 'capacities')
+# Only the first three need float storage; capacity is a 0-100 integer and
+# is packed as uint8 alongside the mode codes.
+_FLOAT_METRICS = HISTORY_METRICS[:3]
+MODE_CODES = {'Charging': 0, 'Discharging': 1, 'Idle': 2}
+# Card accent colors indexed by mode code, in MODE_CODES order.
+_MODE_COLOR_ARR = np.array(['#4caf50', '#e53935', '#90a4ae'])
+
+# Static cell-card markup compiled once; only the five values vary per cell.
+_CARD_TEMPLATE = """
+    <div class="cell-card">
+        <h4 style="text-align:center;">🔋 Cell {i}</h4>
+        <ul style="list-style:none; font-size:15px; color:#333;">
+            <li>🔌 Voltage: <b>{v:.2f} V</b></li>
+            <li>⚡ Current: <b>{c:.2f} A</b></li>
+            <li>🌡️ Temp: <b>{t:.1f} °C</b></li>
+            <li>🔋 Capacity: <b>{cap}%</b></li>
+            <li style="color:{color}; text-align:center;"><b>{mode}</b></li>
+        </ul>
+    </div>
+"""
+
+# Ring lengths above this are backed by a memory-mapped file instead of
+# RAM; only the pages actually touched stay resident.
+HISTORY_SPILL_ROWS = 200
+
+def _unlink_history_file(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _alloc_history(max_history):
+    """Allocate a fresh ring; returns (buffers, spill file path or None)."""
+    if max_history > HISTORY_SPILL_ROWS:
+        # Every ring gets a freshly created file of its own: reopening a
+        # shared path with mode='w+' truncates data that other mappings — a
+        # ring being resized, or another browser session served by this
+        # process — still depend on. Replaced files are unlinked by the
+        # realloc path below; stragglers go at process exit.
+        fd, path = tempfile.mkstemp(prefix="battery_history_", suffix=".dat")
+        os.close(fd)
+        atexit.register(_unlink_history_file, path)
+        spill = np.memmap(path, dtype=np.float32, mode='w+',
+                          shape=(len(_FLOAT_METRICS), max_history, MAX_CELLS))
+        spill[:] = np.nan
+        buffers = {m: spill[k] for k, m in enumerate(_FLOAT_METRICS)}
+    else:
+        path = None
+        buffers = {m: np.full((max_history, MAX_CELLS), np.nan) for m in _FLOAT_METRICS}
+    buffers['capacities'] = np.zeros((max_history, MAX_CELLS), dtype=np.uint8)
+    buffers['modes'] = np.zeros((max_history, MAX_CELLS), dtype=np.uint8)
+    buffers['timestamps'] = np.empty(max_history, dtype='datetime64[us]')
+    return buffers, path
+
+def _history_order():
+    """Indices of the stored rows in chronological order."""
+    ss = st.session_state
+    max_history = ss.history['timestamps'].shape[0]
+    head = ss.head
+    count = min(head, max_history)
+    return np.arange(head - count, head) % max_history
+
 if 'history' not in st.session_state:
-    st.session_state.history = []
+    st.session_state.history, st.session_state.history_file = _alloc_history(100)
+    st.session_state.head = 0
 if 'autoupdate' not in st.session_state:
     st.session_state.autoupdate = False
 if 'max_history' not in st.session_state:
     st.session_state.max_history = 100
 
+# Reallocate the ring when the configured length changes, carrying over
+# the most recent rows that still fit.
+if st.session_state.history['timestamps'].shape[0] != st.session_state.max_history:
+    order = _history_order()[-st.session_state.max_history:]
+    new_history, new_file = _alloc_history(st.session_state.max_history)
+    for key, buf in new_history.items():
+        buf[:len(order)] = st.session_state.history[key][order]
+    st.session_state.history = new_history
+    if st.session_state.history_file:
+        _unlink_history_file(st.session_state.history_file)
+    st.session_state.history_file = new_file
+    st.session_state.head = len(order)
+
 # ---------- Header ----------
 st.markdown("""
 <div class="header-container">
@@ -107,17 +199,33 @@ for i in range(num_cells):
         capacities.append(st.number_input("Capacity (%)", 0, 100, 100, key=f"cap_{i}"))
         modes.append(st.selectbox("Mode", options=mode_options, index=2, key=f"m_{i}"))
 
+# Array views of the widget values, shared by alerts and summary metrics.
+v_arr = np.asarray(voltages)
+c_arr = np.asarray(currents)
+t_arr = np.asarray(temperatures)
+cap_arr = np.asarray(capacities)
+mode_arr = np.array([MODE_CODES[m] for m in modes], dtype=np.uint8)
+
+# Fingerprint of the current inputs; lets autorefresh ticks with unchanged
+# widgets reuse cached render output instead of rebuilding it.
+inputs_hash = hashlib.blake2b(
+    v_arr.tobytes() + c_arr.tobytes() + t_arr.tobytes() +
+    cap_arr.tobytes() + mode_arr.tobytes()
+).digest()
+
 if st.sidebar.button("🚀 Update Now") or autoupdate:
-    st.session_state.history.append({
-        'timestamp': datetime.now(),
-        'voltages': voltages.copy(),
-        'currents': currents.copy(),
-        'temperatures': temperatures.copy(),
-        'capacities': capacities.copy(),
-        'modes': modes.copy()
-    })
-    if len(st.session_state.history) > st.session_state.max_history:
-        st.session_state.history = st.session_state.history[-st.session_state.max_history:]
+    # Bind the proxy and its fields to locals once; every attribute access
+    # on st.session_state goes through __getattr__ plus a dict lookup.
+    ss = st.session_state
+    hist = ss.history
+    idx = ss.head % ss.max_history
+    hist['timestamps'][idx] = np.datetime64(datetime.now())
+    hist['voltages'][idx, :num_cells] = voltages
+    hist['currents'][idx, :num_cells] = currents
+    hist['temperatures'][idx, :num_cells] = temperatures
+    hist['capacities'][idx, :num_cells] = capacities
+    hist['modes'][idx, :num_cells] = mode_arr
+    ss.head += 1
 
 # ---------- Main Tabs ----------
 tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "📈 Graphs", "⚙️ Settings"])
@@ -126,13 +234,13 @@ tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "📈 Graphs", "⚙️ Settings"])
 with tab1:
     st.subheader("🔋 Cell Overview")
 
-    # Alerts
-    alert_msgs = []
-    for i in range(num_cells):
-        if temperatures[i] > temp_threshold:
-            alert_msgs.append(f"🔥 <strong>Cell {i+1} Overheating</strong>: {temperatures[i]:.1f} °C")
-        if voltages[i] < volt_threshold:
-            alert_msgs.append(f"⚡ <strong>Low Voltage</strong> on Cell {i+1}: {voltages[i]:.2f} V")
+    # Alerts — vectorized threshold checks; only flagged cells get formatted.
+    hot = np.flatnonzero(t_arr > temp_threshold)
+    low = np.flatnonzero(v_arr < volt_threshold)
+    alert_msgs = (
+        [f"🔥 <strong>Cell {i+1} Overheating</strong>: {t_arr[i]:.1f} °C" for i in hot] +
+        [f"⚡ <strong>Low Voltage</strong> on Cell {i+1}: {v_arr[i]:.2f} V" for i in low]
+    )
     if alert_msgs:
         st.markdown(f"""
         <div style="background:#fff8e1; padding:1rem; border-left:5px solid #ff9800; border-radius:10px;">
@@ -141,49 +249,63 @@ with tab1:
         </div>
         """, unsafe_allow_html=True)
 
-    # Cells Display
-    cell_rows = [st.columns(4) for _ in range((num_cells + 3) // 4)]
-    mode_colors = {'Charging': '#4caf50', 'Discharging': '#e53935', 'Idle': '#90a4ae'}
-    for i in range(num_cells):
-        with cell_rows[i // 4][i % 4]:
-            st.markdown(f"""
-                <div class="cell-card">
-                    <h4 style="text-align:center;">🔋 Cell {i+1}</h4>
-                    <ul style="list-style:none; font-size:15px; color:#333;">
-                        <li>🔌 Voltage: <b>{voltages[i]:.2f} V</b></li>
-                        <li>⚡ Current: <b>{currents[i]:.2f} A</b></li>
-                        <li>🌡️ Temp: <b>{temperatures[i]:.1f} °C</b></li>
-                        <li>🔋 Capacity: <b>{capacities[i]}%</b></li>
-                        <li style="color:{mode_colors[modes[i]]}; text-align:center;"><b>{modes[i]}</b></li>
-                    </ul>
-                </div>
-            """, unsafe_allow_html=True)
-
-    # Summary Metrics
+    # Cells Display — one CSS grid in a single st.markdown call, instead of
+    # a columns layout plus one frontend message per cell. The grid HTML is
+    # rebuilt only when the inputs fingerprint changes, so autorefresh ticks
+    # with untouched widgets reuse the cached string.
+    if st.session_state.get('cards_hash') != inputs_hash:
+        cards = "".join(
+            _CARD_TEMPLATE.format(i=i+1, v=voltages[i], c=currents[i],
+                                  t=temperatures[i], cap=capacities[i],
+                                  mode=modes[i], color=_MODE_COLOR_ARR[mode_arr[i]])
+            for i in range(num_cells)
+        )
+        st.session_state.cards_html = (
+            f"<div style='display:grid; grid-template-columns:repeat(4, 1fr); gap:1rem;'>{cards}</div>"
+        )
+        st.session_state.cards_hash = inputs_hash
+    st.markdown(st.session_state.cards_html, unsafe_allow_html=True)
+
+    # Summary Metrics — one flex row in a single markdown call; no per-rerun
+    # st.columns allocation left in this tab.
     st.markdown("### 📌 Summary")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown(f"<div class='summary-box'>🔋<br><b>Avg Voltage:</b><br>{sum(voltages)/num_cells:.2f} V</div>", unsafe_allow_html=True)
-    with col2:
-        st.markdown(f"<div class='summary-box'>🌡️<br><b>Avg Temp:</b><br>{sum(temperatures)/num_cells:.1f} °C</div>", unsafe_allow_html=True)
-    with col3:
-        st.markdown(f"<div class='summary-box'>📈<br><b>Avg Capacity:</b><br>{sum(capacities)/num_cells:.1f} %</div>", unsafe_allow_html=True)
+    st.markdown(f"""
+        <div style='display:flex; gap:1rem;'>
+            <div class='summary-box' style='flex:1;'>🔋<br><b>Avg Voltage:</b><br>{v_arr.mean():.2f} V</div>
+            <div class='summary-box' style='flex:1;'>🌡️<br><b>Avg Temp:</b><br>{t_arr.mean():.1f} °C</div>
+            <div class='summary-box' style='flex:1;'>📈<br><b>Avg Capacity:</b><br>{cap_arr.mean():.1f} %</div>
+        </div>
+    """, unsafe_allow_html=True)
 
 # ---------- Tab 2: Graphs ----------
 with tab2:
     st.subheader("📈 Historical Graphs")
-    df = pd.DataFrame(st.session_state.history)
-    if not df.empty:
-        ts = [e["timestamp"] for e in st.session_state.history]
-        metrics = ["voltages", "currents", "temperatures", "capacities"]
-        labels = ["Voltage (V)", "Current (A)", "Temperature (°C)", "Capacity (%)"]
-        for metric, label in zip(metrics, labels):
-            fig = go.Figure()
-            for i in range(num_cells):
-                series = [entry[metric][i] for entry in st.session_state.history]
-                fig.add_trace(go.Scatter(x=ts, y=series, mode='lines+markers', name=f"Cell {i+1}"))
-            fig.update_layout(title=label, xaxis_title="Time", yaxis_title=label, height=350, template="plotly_white")
-            st.plotly_chart(fig, use_container_width=True)
+    order = _history_order()
+    if len(order):
+        # Rebuild the figures only when history has grown or the cell count
+        # changed; otherwise resubmit the ones built on a previous rerun.
+        graphs_key = (st.session_state.head, num_cells)
+        if st.session_state.get('graphs_key') != graphs_key:
+            hist = st.session_state.history
+            ts = hist['timestamps'][order]
+            labels = ["Voltage (V)", "Current (A)", "Temperature (°C)", "Capacity (%)"]
+            # One fused subplots figure: a single chart push to the browser
+            # instead of four, with the x axis shared across metrics.
+            fig = make_subplots(rows=len(HISTORY_METRICS), cols=1,
+                                shared_xaxes=True, subplot_titles=labels)
+            for row, (metric, label) in enumerate(zip(HISTORY_METRICS, labels), start=1):
+                data = hist[metric][order]
+                # Hand all traces over at once; per-trace add_trace calls
+                # revalidate the figure schema every time.
+                traces = [go.Scatter(x=ts, y=data[:, i], mode='lines+markers', name=f"Cell {i+1}",
+                                     legendgroup=f"Cell {i+1}", showlegend=(row == 1))
+                          for i in range(num_cells)]
+                fig.add_traces(traces, rows=row, cols=1)
+                fig.update_yaxes(title_text=label, row=row, col=1)
+            fig.update_layout(height=1200, template="plotly_white")
+            st.session_state.graphs = fig
+            st.session_state.graphs_key = graphs_key
+        st.plotly_chart(st.session_state.graphs, use_container_width=True)
     else:
         st.info("No data yet.")
 
@@ -192,7 +314,7 @@ with tab3:
     st.subheader("⚙️ Configuration & Reset")
     st.number_input("Max History Length", 10, 1000, value=st.session_state.max_history, step=10, key="max_history")
     if st.button("🗑️ Clear History"):
-        st.session_state.history = []
+        st.session_state.head = 0
         st.success("History Cleared.")
 
 # ---------- Footer ----------